@@ -18,3 +18,7 @@ MIN_PRODUCTION_SPEED = 10
 MAX_PRODUCTION_SPEED = 5
 
 MAX_ATTACK_SPEED = 10
+
+NO_DESTINATION = -1
+NO_PLANET = -1
+NO_FLEET = -1
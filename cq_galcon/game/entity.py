@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from typing import Optional, NamedTuple
+from typing import TYPE_CHECKING, Optional, NamedTuple
 
 import math
 
-from cq_galcon.game.constants import MAX_FLEET_SPEED, Team
+from cq_galcon.game.constants import NO_DESTINATION, Team
+
+if TYPE_CHECKING:
+    from cq_galcon.game.game import Game
 
 
 class MoveCommand:
+    __slots__ = ("fleet", "destination", "split")
+
     fleet: Fleet
     destination: Planet
     split: bool
@@ -27,43 +32,141 @@ class Position(NamedTuple):
 
 
 class Entity:
-    position: Position
+    # Entities are thin views: the data lives in the Game's column arrays, the view only holds a row index.
+    # Single values are read with ndarray.item, which returns a Python scalar without building a NumPy one
+    __slots__ = ("game", "index")
+
+    game: Game
+    index: int
+
+    def __init__(self, game: Game, index: int):
+        self.game = game
+        self.index = index
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            type(self) is type(other)
+            and self.game is other.game  # type: ignore[attr-defined]
+            and self.index == other.index  # type: ignore[attr-defined]
+        )
 
-    def __init__(self, position: Position):
-        self.position = position
+    def __hash__(self) -> int:
+        return hash((type(self), id(self.game), self.index))
 
 
 class Fleet(Entity):
-    team: Team
-    strength: int
-    destination: Optional[Planet]
-
-    def __init__(
-        self,
-        team: Team,
-        position: Position,
-        strength: int,
-        destination: Optional[Planet],
-    ):
-        super().__init__(position)
-        self.team = team
-        self.strength = strength
-        self.destination = destination
+    # Dead fleet slots are reused, the generation tells this fleet apart from later ones in the same slot
+    __slots__ = ("generation",)
+
+    generation: int
+
+    def __init__(self, game: Game, index: int):
+        super().__init__(game, index)
+        self.generation = game.fleet_generation.item(index)
+
+    def __eq__(self, other: object) -> bool:
+        return super().__eq__(other) and self.generation == other.generation  # type: ignore[attr-defined]
+
+    def __hash__(self) -> int:
+        return hash((type(self), id(self.game), self.index, self.generation))
+
+    def _current_index(self) -> int:
+        # Reading or writing through a view of a fleet whose slot was reused would touch the new fleet
+        if self.generation != self.game.fleet_generation.item(self.index):
+            raise ValueError(self, "Fleet was destroyed and its slot reused")
+        return self.index
+
+    @property
+    def position(self) -> Position:
+        index = self._current_index()
+        return Position(
+            float(self.game.fleet_pos_x.item(index)),
+            float(self.game.fleet_pos_y.item(index)),
+        )
+
+    @position.setter
+    def position(self, position: Position) -> None:
+        index = self._current_index()
+        self.game.fleet_pos_x[index] = round(position.x)
+        self.game.fleet_pos_y[index] = round(position.y)
+
+    # Coordinates read straight from the columns, without building a Position
+    @property
+    def x(self) -> int:
+        return self.game.fleet_pos_x.item(self._current_index())
+
+    @property
+    def y(self) -> int:
+        return self.game.fleet_pos_y.item(self._current_index())
+
+    @property
+    def team(self) -> Team:
+        return Team(self.game.fleet_team.item(self._current_index()))
+
+    @property
+    def strength(self) -> int:
+        return self.game.fleet_strength.item(self._current_index())
+
+    @strength.setter
+    def strength(self, strength: int) -> None:
+        self.game.fleet_strength[self._current_index()] = strength
+
+    @property
+    def destination(self) -> Optional[Planet]:
+        destination = self.game.fleet_dest.item(self._current_index())
+        if destination == NO_DESTINATION:
+            return None
+        return Planet(self.game, destination)
+
+    @destination.setter
+    def destination(self, destination: Optional[Planet]) -> None:
+        self.game.fleet_dest[self._current_index()] = (
+            NO_DESTINATION if destination is None else destination.index
+        )
 
     def move(self, destination: Planet, split: bool = False) -> MoveCommand:
         return MoveCommand(self, destination, split)
 
     def can_dock(self, destination: Planet) -> bool:
-        return (
-            self.position.distance_to(destination.position)
-            < destination.size + MAX_FLEET_SPEED
-        )
+        dx = self.x - destination.x
+        dy = self.y - destination.y
+        return dx * dx + dy * dy < destination.dock_radius_sq
 
 
 class Planet(Entity):
-    production_speed: int
-    remaining_until_new_ship: int
-    defending_fleet: Fleet
+    __slots__ = ()
+
+    @property
+    def position(self) -> Position:
+        return Position(
+            float(self.game.planet_pos_x.item(self.index)),
+            float(self.game.planet_pos_y.item(self.index)),
+        )
+
+    @property
+    def x(self) -> int:
+        return self.game.planet_pos_x.item(self.index)
+
+    @property
+    def y(self) -> int:
+        return self.game.planet_pos_y.item(self.index)
+
+    @property
+    def production_speed(self) -> int:
+        return self.game.planet_production_speed.item(self.index)
+
+    @property
+    def remaining_until_new_ship(self) -> int:
+        production_speed = self.production_speed
+        return production_speed - self.game.tick % production_speed
+
+    @property
+    def defending_fleet(self) -> Fleet:
+        return Fleet(self.game, self.game.planet_defender.item(self.index))
+
+    @defending_fleet.setter
+    def defending_fleet(self, fleet: Fleet) -> None:
+        self.game.set_defender(self.index, fleet.index)
 
     @property
     def team(self) -> Team:
@@ -71,16 +174,8 @@ class Planet(Entity):
 
     @property
     def size(self) -> int:
-        return self.production_speed + 4
-
-    def __init__(
-        self,
-        position: Position,
-        production_speed: int,
-        defending_fleet: Fleet,
-    ):
-        super().__init__(position)
-
-        self.production_speed = production_speed
-        self.remaining_until_new_ship = production_speed
-        self.defending_fleet = defending_fleet
+        return self.game.planet_size.item(self.index)
+
+    @property
+    def dock_radius_sq(self) -> int:
+        return self.game.planet_dock_radius_sq.item(self.index)
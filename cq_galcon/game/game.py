@@ -1,7 +1,8 @@
-from typing import List, Optional, Iterable, Tuple
+from typing import Dict, List, Optional, Iterable, Tuple
+import heapq
 import math
 
-import vectormath as vmath
+import numpy as np
 
 import random
 from cq_galcon.game.entity import Entity, Fleet, Planet, MoveCommand, Position
@@ -12,217 +13,445 @@ from cq_galcon.game.constants import (
     MAP_HEIGHT,
     MAX_PRODUCTION_SPEED,
     MIN_PRODUCTION_SPEED,
-    MAX_ATTACK_SPEED,
+    NO_DESTINATION,
+    NO_PLANET,
+    NO_FLEET,
 )
+from cq_galcon.game.kernels import tick_kernel, production_kernel, release_planet
+
+INITIAL_FLEET_CAPACITY = 16
+GROWTH_FACTOR = 1.6
+
+# The game state is stored as one array per field (structure of arrays), indexed by fleet/planet index
+FLEET_COLUMNS: Dict[str, type] = {
+    "fleet_pos_x": np.int16,
+    "fleet_pos_y": np.int16,
+    "fleet_team": np.int8,
+    "fleet_strength": np.int32,
+    "fleet_dest": np.int32,
+    "fleet_defended_planet": np.int32,
+    # Number of planets defended, a fleet records only one of them in fleet_defended_planet
+    "fleet_defended_count": np.int32,
+    "fleet_generation": np.int32,
+    "fleet_alive": np.bool_,
+    "fleet_is_player": np.bool_,
+}
+
+PLANET_COLUMNS: Dict[str, type] = {
+    "planet_pos_x": np.int16,
+    "planet_pos_y": np.int16,
+    "planet_production_speed": np.int32,
+    "planet_defender": np.int32,
+    "planet_size": np.int32,
+    "planet_dock_radius_sq": np.int32,
+    "planet_is_player": np.bool_,
+}
+
+
+# Buffers the phases report fleet indices into, as entries per fleet slot. They live on the Game and are
+# only reallocated when the fleet arrays grow, the slices returned by a step are overwritten by the next one
+SCRATCH_BUFFERS: Dict[str, int] = {
+    "_moved_fleets": 1,
+    "_merging_fleets": 1,
+    "_merged_fleets": 1,
+    # Each combat destroys at most the attacker and the defender
+    "_destroyed_fleets": 2,
+}
+
+# Positions are whole map coordinates stored as int16, squared distances between them must fit in int32
+assert max(MAP_WIDTH, MAP_HEIGHT) <= np.iinfo(np.int16).max
+assert MAP_WIDTH * MAP_WIDTH + MAP_HEIGHT * MAP_HEIGHT < np.iinfo(np.int32).max
+
+
+def grown_capacity(capacity: int) -> int:
+    # Amortized geometric growth, so appending an entity is O(1)
+    return math.ceil(capacity * GROWTH_FACTOR)
 
 
 class Game:
-    state: List[Entity]
-
-    @staticmethod
-    def init_random_game_state() -> List[Entity]:
-        state: List[Entity] = []
-
+    tick: int
+
+    fleet_count: int
+    free_fleets: List[int]
+    fleet_pos_x: np.ndarray
+    fleet_pos_y: np.ndarray
+    fleet_team: np.ndarray
+    fleet_strength: np.ndarray
+    fleet_dest: np.ndarray
+    fleet_defended_planet: np.ndarray
+    fleet_defended_count: np.ndarray
+    fleet_generation: np.ndarray
+    fleet_alive: np.ndarray
+    fleet_is_player: np.ndarray
+
+    planet_count: int
+    planet_pos_x: np.ndarray
+    planet_pos_y: np.ndarray
+    planet_production_speed: np.ndarray
+    planet_defender: np.ndarray
+    planet_size: np.ndarray
+    planet_dock_radius_sq: np.ndarray
+    planet_is_player: np.ndarray
+
+    # View lists rebuilt only after entities are created/destroyed or a planet changes hands
+    _fleets: Optional[List[Fleet]]
+    _planets: Optional[List[Planet]]
+    _player_fleets: Optional[List[Fleet]]
+    _player_planets: Optional[List[Planet]]
+
+    # Uniform grid of planet indices keyed by cell, rebuilt only after a planet is created
+    _planet_grid: Optional[Dict[Tuple[int, int], List[int]]]
+    _planet_cell_size: int
+
+    _moved_fleets: np.ndarray
+    _merging_fleets: np.ndarray
+    _merged_fleets: np.ndarray
+    _destroyed_fleets: np.ndarray
+    _created_fleets: np.ndarray
+
+    def init_random_game_state(self) -> None:
         for i in Team:
             x_rand = random.randint(0, MAP_WIDTH)
             y_rand = random.randint(0, MAP_HEIGHT)
 
-            fleet = Fleet(i, Position(x_rand, y_rand), 10, None)
+            fleet = self.create_fleet(i, Position(x_rand, y_rand), 10, None)
 
-            planet = Planet(
+            self.create_planet(
                 Position(x_rand, y_rand),
                 random.randint(MAX_PRODUCTION_SPEED, MIN_PRODUCTION_SPEED),
                 fleet,
             )
-            state.append(fleet)
-            state.append(planet)
-        return state
 
     def __init__(self, seed) -> None:
         random.seed(seed)
-        self.state = Game.init_random_game_state()
+        self.tick = 0
+        self.fleet_count = 0
+        self.free_fleets = []
+        self.planet_count = 0
+        self._fleets = None
+        self._planets = None
+        self._player_fleets = None
+        self._player_planets = None
+        self._planet_grid = None
+        self._planet_cell_size = 0
+        for name in SCRATCH_BUFFERS:
+            setattr(self, name, np.empty(0, dtype=np.int64))
+        self._created_fleets = np.empty(0, dtype=np.int64)
+        self._resize(FLEET_COLUMNS, INITIAL_FLEET_CAPACITY)
+        self._resize(PLANET_COLUMNS, len(Team))
+        self.init_random_game_state()
+
+    def _resize(self, columns: Dict[str, type], capacity: int) -> None:
+        for name, dtype in columns.items():
+            column: np.ndarray = np.zeros(capacity, dtype=dtype)
+            old_column: Optional[np.ndarray] = getattr(self, name, None)
+            if old_column is not None:
+                column[: len(old_column)] = old_column
+            setattr(self, name, column)
+
+    def create_fleet(
+        self,
+        team: Team,
+        position: Position,
+        strength: int,
+        destination: Optional[Planet],
+    ) -> Fleet:
+        index = self._create_fleet(
+            team.value,
+            round(position.x),
+            round(position.y),
+            strength,
+            NO_DESTINATION if destination is None else destination.index,
+        )
+        return Fleet(self, index)
+
+    def _create_fleet(
+        self, team: int, x: int, y: int, strength: int, destination: int
+    ) -> int:
+        # Reuse the lowest dead slot first, only grow the arrays when there is none
+        if self.free_fleets:
+            index = heapq.heappop(self.free_fleets)
+            self.fleet_generation[index] += 1
+        else:
+            if self.fleet_count == len(self.fleet_alive):
+                self._resize(FLEET_COLUMNS, grown_capacity(len(self.fleet_alive)))
+
+            index = self.fleet_count
+            self.fleet_count += 1
+
+        self.fleet_pos_x[index] = x
+        self.fleet_pos_y[index] = y
+        self.fleet_team[index] = team
+        self.fleet_strength[index] = strength
+        self.fleet_dest[index] = destination
+        self.fleet_defended_planet[index] = NO_PLANET
+        self.fleet_defended_count[index] = 0
+        self.fleet_alive[index] = True
+        self.fleet_is_player[index] = team != Team.NEUTREAL.value
+        self._fleets = None
+        self._player_fleets = None
+        return index
+
+    def create_planet(
+        self, position: Position, production_speed: int, defending_fleet: Fleet
+    ) -> Planet:
+        if self.planet_count == len(self.planet_defender):
+            self._resize(PLANET_COLUMNS, grown_capacity(len(self.planet_defender)))
+
+        index = self.planet_count
+        self.planet_count += 1
+
+        self.planet_pos_x[index] = round(position.x)
+        self.planet_pos_y[index] = round(position.y)
+        self.planet_production_speed[index] = production_speed
+        self.planet_defender[index] = NO_FLEET
+
+        # production_speed never changes, so the size and squared docking radius are computed once
+        self.planet_size[index] = production_speed + 4
+        self.planet_dock_radius_sq[index] = (
+            self.planet_size[index] + MAX_FLEET_SPEED
+        ) ** 2
+        self.set_defender(index, defending_fleet.index)
+        self._planets = None
+        self._planet_grid = None
+        return Planet(self, index)
+
+    def _build_planet_grid(self) -> Dict[Tuple[int, int], List[int]]:
+        # A cell spans the largest docking diameter, so any docking range overlaps at most 2x2 cells
+        max_dock_radius = math.isqrt(
+            int(self.planet_dock_radius_sq[: self.planet_count].max())
+        )
+        self._planet_cell_size = 2 * (max_dock_radius + 1)
 
-    def step(self, commands: List[MoveCommand]) -> None:
-        self._handle_commands(commands)
-        self._handle_already_defending_fleets()
-        created_fleets = self._handle_departures()
-        moved_fleets = self._handle_movement()  # noqa F841
-        merging_fleet, merged_fleets = self._handle_reinforce()
-        destroyed_fleets = self._handle_combat()
-        self._handle_production()
+        grid: Dict[Tuple[int, int], List[int]] = {}
+        for planet in range(self.planet_count):
+            cell = (
+                int(self.planet_pos_x[planet] // self._planet_cell_size),
+                int(self.planet_pos_y[planet] // self._planet_cell_size),
+            )
+            grid.setdefault(cell, []).append(planet)
+        return grid
 
-        # Update the game state by 1: adding newly created fleet and 2: deleting destroyed/merged fleet
-        self.state.extend(created_fleets)
+    def planets_near(self, x: float, y: float) -> Iterable[int]:
+        # Candidates only: every planet a fleet at (x, y) can dock at is returned, along with some that are too far
+        if self._planet_grid is None:
+            self._planet_grid = self._build_planet_grid()
 
-        to_remove = []
-        to_remove.extend(merged_fleets)
-        to_remove.extend(destroyed_fleets)
+        return [
+            planet
+            for cell_x in self._planet_cells(x)
+            for cell_y in self._planet_cells(y)
+            for planet in self._planet_grid.get((cell_x, cell_y), ())
+        ]
 
-        for fleet in to_remove:
-            self.state.remove(fleet)
+    def _planet_cells(self, coordinate: float) -> range:
+        reach = self._planet_cell_size // 2
+        return range(
+            int((coordinate - reach) // self._planet_cell_size),
+            int((coordinate + reach) // self._planet_cell_size) + 1,
+        )
 
-    def _handle_already_defending_fleets(self):
-        # Error Check : Ignore those that wants to defend where they're already where they want to defend
-        for fleet in self.all_player_fleets:
-            if fleet.destination.defending_fleet == fleet:
-                fleet.destination = None
+    def set_defender(self, planet: int, fleet: int) -> None:
+        previous_defender = self.planet_defender[planet]
+        self.planet_defender[planet] = fleet
+        if previous_defender != NO_FLEET:
+            release_planet(
+                previous_defender,
+                planet,
+                self.fleet_defended_planet,
+                self.fleet_defended_count,
+                self.planet_defender[: self.planet_count],
+            )
 
-    def _handle_commands(self, commands: List[MoveCommand]):
-        for command in commands:
-            command.fleet.destination = command.destination
-
-    def _handle_movement(self) -> List[Fleet]:
-        moved_fleets: List[Fleet] = []
-        for fleet in self.all_player_fleets:
-            # fleet does not want to move (already docked somewhere)
-            if not fleet.destination:
-                continue
+        self.fleet_defended_planet[fleet] = planet
+        self.fleet_defended_count[fleet] += 1
+        self.planet_is_player[planet] = self.fleet_team[fleet] != Team.NEUTREAL.value
+        self._player_planets = None
 
-            # Handle docking/combat in another phase
-            if fleet.can_dock(fleet.destination):
-                continue
+    def _destroy_fleets(self, fleets: np.ndarray) -> None:
+        if len(fleets) == 0:
+            return
 
-            self._move_fleet(fleet)
-            moved_fleets.append(fleet)
+        fleets = np.unique(fleets)
+        self.fleet_alive[fleets] = False
+        self.fleet_is_player[fleets] = False
 
-        return moved_fleets
+        # Destroyed defenders mean planets were captured inside the tick kernel
+        self._fleets = None
+        self._player_fleets = None
+        self._player_planets = None
 
-    def _handle_reinforce(self) -> Tuple[List[Fleet], List[Fleet]]:
-        merging_fleets: List[Fleet] = []
-        merged_fleets: List[Fleet] = []
-        for fleet in self.all_player_fleets:
-            if not fleet.destination:
-                continue
+        # A planet can still be held by a destroyed defender, its slot is freed once the planet is captured
+        for fleet in fleets[self.fleet_defended_count[fleets] == 0]:
+            heapq.heappush(self.free_fleets, int(fleet))
 
-            if fleet.team != fleet.destination.team:
-                continue
+    def step(self, commands: List[MoveCommand]) -> None:
+        self.tick += 1
+        self._handle_commands(commands)
 
-            if not fleet.can_dock(fleet.destination):
-                continue
+        # Fleets created by departures only start acting on the next step
+        fleets = self.player_fleet_indices
 
-            reinforcement_value = min(fleet.strength, MAX_ATTACK_SPEED)
+        created_fleets = self._handle_departures()  # noqa F841
+        (
+            moved_fleets,  # noqa F841
+            merging_fleets,  # noqa F841
+            merged_fleets,
+            destroyed_fleets,
+        ) = self._handle_fleets(fleets)
+        self._handle_production()
 
-            fleet.destination.defending_fleet.strength += reinforcement_value
-            fleet.strength -= reinforcement_value
+        # Update the game state by deleting destroyed/merged fleet, created fleets are already stored.
+        # A fleet can both merge and lose the planet it defends, a single call frees its slot only once
+        self._destroy_fleets(np.concatenate((merged_fleets, destroyed_fleets)))
 
-            if fleet.strength == 0:
-                merged_fleets.append(fleet)
-            else:
-                merging_fleets.append(fleet)
+    def _handle_commands(self, commands: List[MoveCommand]):
+        if not commands:
+            return
+
+        cmd_fleet_idx = np.array([command.fleet.index for command in commands])
+        cmd_fleet_gen = np.array([command.fleet.generation for command in commands])
+        cmd_dest_idx = np.array([command.destination.index for command in commands])
+
+        # Ignore commands given to fleets whose slot has since been reused by another fleet
+        current = self.fleet_generation[cmd_fleet_idx] == cmd_fleet_gen
+        self.fleet_dest[cmd_fleet_idx[current]] = cmd_dest_idx[current]
+
+    def _handle_fleets(
+        self, fleets: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if len(self._moved_fleets) < len(fleets):
+            for name, per_fleet in SCRATCH_BUFFERS.items():
+                setattr(
+                    self, name, np.empty(per_fleet * len(self.fleet_alive), np.int64)
+                )
+
+        moved, merging, merged, destroyed = tick_kernel(
+            fleets,
+            self.fleet_pos_x,
+            self.fleet_pos_y,
+            self.fleet_team,
+            self.fleet_strength,
+            self.fleet_dest,
+            self.fleet_defended_planet,
+            self.fleet_defended_count,
+            # Planet columns are trimmed to the planets in play, release_planet scans planet_defender
+            self.planet_pos_x[: self.planet_count],
+            self.planet_pos_y[: self.planet_count],
+            self.planet_defender[: self.planet_count],
+            self.planet_dock_radius_sq[: self.planet_count],
+            self.planet_is_player[: self.planet_count],
+            self._moved_fleets,
+            self._merging_fleets,
+            self._merged_fleets,
+            self._destroyed_fleets,
+        )
+        return (
+            self._moved_fleets[:moved],
+            self._merging_fleets[:merging],
+            self._merged_fleets[:merged],
+            self._destroyed_fleets[:destroyed],
+        )
 
-        return merging_fleets, merged_fleets
+    def _handle_departures(self) -> np.ndarray:
+        # At most one departure per planet
+        if len(self._created_fleets) < self.planet_count:
+            self._created_fleets = np.empty(len(self.planet_defender), np.int64)
+
+        created = 0
+        for planet in self.player_planet_indices:
+            destination = self.fleet_dest[self.planet_defender[planet]]
 
-    def _handle_departures(self) -> List[Fleet]:
-        created_fleets: List[Fleet] = []
-        for planet in self.all_player_planets:
             # does not wish to depart
-            if not planet.defending_fleet.destination:
+            if destination == NO_DESTINATION:
                 continue
 
             # already at destination
-            if planet.defending_fleet.destination == planet:
+            if destination == planet:
                 continue
 
-            new_fleet = self._handle_departure(
-                planet, planet.defending_fleet.destination
-            )
-
-            created_fleets.append(new_fleet)
-        return created_fleets
+            self._created_fleets[created] = self._handle_departure(planet, destination)
+            created += 1
+        return self._created_fleets[:created]
 
     def _handle_departure(
-        self, origin: Planet, destination: Planet, split: bool = False
-    ):
-        strenght_of_new_fleet = origin.defending_fleet.strength
-        if split:
-            strenght_of_new_fleet = math.ceil(origin.defending_fleet.strength / 2)
+        self, origin: int, destination: int, split: bool = False
+    ) -> int:
+        defending_fleet = self.planet_defender[origin]
 
-        new_fleet = Fleet(
-            origin.team, origin.position, strenght_of_new_fleet, destination
+        strenght_of_new_fleet = int(self.fleet_strength[defending_fleet])
+        if split:
+            strenght_of_new_fleet = math.ceil(strenght_of_new_fleet / 2)
+
+        new_fleet = self._create_fleet(
+            int(self.fleet_team[defending_fleet]),
+            self.planet_pos_x[origin],
+            self.planet_pos_y[origin],
+            strenght_of_new_fleet,
+            destination,
         )
 
-        origin.defending_fleet.strength -= new_fleet.strength
+        self.fleet_strength[defending_fleet] -= strenght_of_new_fleet
         return new_fleet
 
-    def _handle_combat(self) -> List[Fleet]:
-        destroyed_fleets: List[Fleet] = []
-        for fleet in self.all_player_fleets:
-            # Does not have a destination (fleets not moving)
-            if not fleet.destination:
-                continue
-
-            # Not yet arrived at destination
-            if not fleet.can_dock(fleet.destination):
-                continue
-
-            defending_fleet_dmg = min(fleet.strength, MAX_ATTACK_SPEED)
-            attacking_fleet_dmg = min(
-                fleet.destination.defending_fleet.strength, MAX_ATTACK_SPEED
-            )
-
-            fleet.destination.defending_fleet.strength -= defending_fleet_dmg
-            fleet.strength -= attacking_fleet_dmg
-
-            # In case of draw, defending fleet keep 1 strength
-            if fleet.destination.defending_fleet.strength == 0:
-                fleet.destination.defending_fleet.strength = 1
+    def _handle_production(self):
+        production_kernel(
+            self.tick,
+            self.planet_is_player,
+            self.planet_production_speed,
+            self.planet_defender,
+            self.fleet_strength,
+        )
 
-            if fleet.destination.defending_fleet.strength < 0:
-                destroyed_fleets.append(fleet.destination.defending_fleet)
-                fleet.destination.defending_fleet = fleet
+    @property
+    def player_fleet_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.fleet_is_player[: self.fleet_count])
 
-            if fleet.strength <= 0:
-                destroyed_fleets.append(fleet)
+    @property
+    def player_planet_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.planet_is_player[: self.planet_count])
 
-        return destroyed_fleets
+    @property
+    def state(self) -> List[Entity]:
+        # Fleets and planets are kept apart, prefer all_fleets/all_planets over filtering this list by type
+        return [*self.all_fleets, *self.all_planets]
 
-    def _handle_production(self):
-        for planet in self.all_player_planets:
-            planet.remaining_until_new_ship -= 1
-            if planet.remaining_until_new_ship <= 0:
-                planet.remaining_until_new_ship = planet.production_speed
-                planet.defending_fleet.strength += 1
+    @property
+    def all_planets(self) -> List[Planet]:
+        if self._planets is None:
+            self._planets = [
+                Planet(self, planet) for planet in range(self.planet_count)
+            ]
+        return self._planets
 
     @property
     def all_player_planets(self) -> List[Planet]:
-        return [
-            planet
-            for planet in self.state
-            if isinstance(planet, Planet) and planet.team != Team.NEUTREAL
-        ]
+        if self._player_planets is None:
+            self._player_planets = [
+                Planet(self, int(planet)) for planet in self.player_planet_indices
+            ]
+        return self._player_planets
 
     @property
     def all_fleets(self) -> Iterable[Fleet]:
-        return [fleet for fleet in self.state if isinstance(fleet, Fleet)]
+        if self._fleets is None:
+            self._fleets = [
+                Fleet(self, int(fleet))
+                for fleet in np.flatnonzero(self.fleet_alive[: self.fleet_count])
+            ]
+        return self._fleets
 
     @property
     def all_player_fleets(self) -> Iterable[Fleet]:
-        return [
-            fleet
-            for fleet in self.state
-            if isinstance(fleet, Fleet) and fleet.team != Team.NEUTREAL
-        ]
+        if self._player_fleets is None:
+            self._player_fleets = [
+                Fleet(self, int(fleet)) for fleet in self.player_fleet_indices
+            ]
+        return self._player_fleets
 
     def find_planet(self, defender: Fleet) -> Optional[Planet]:
-        for planet in self.all_player_planets:
-            if planet.defending_fleet == defender:
-                return planet
-
-        return None
-
-    def _move_fleet(self, fleet: Fleet):
-        if not fleet.destination:
-            raise ValueError(fleet, "Fleet should have a destination")
-
-        fleet_pos = vmath.Vector2(fleet.position.x, fleet.position.y)
-        dest_pos = vmath.Vector2(
-            fleet.destination.position.x, fleet.destination.position.y
-        )
-
-        toward = dest_pos - fleet_pos
-
-        max_speed = min(toward.length - fleet.destination.size, MAX_FLEET_SPEED)
-
-        newpos = toward.normalize() * max_speed
+        planet = self.fleet_defended_planet[defender._current_index()]
+        if planet == NO_PLANET or not self.planet_is_player[planet]:
+            return None
 
-        fleet.position = Position(newpos.x, newpos.y)
+        return Planet(self, int(planet))
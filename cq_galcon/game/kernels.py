@@ -0,0 +1,224 @@
+import math
+from typing import Tuple
+
+import numpy as np
+from numba import njit, types
+
+from cq_galcon.game.constants import (
+    MAX_FLEET_SPEED,
+    MAX_ATTACK_SPEED,
+    NO_DESTINATION,
+    NO_PLANET,
+)
+
+# Per-tick phases compiled to machine code. They only take the Game's column arrays, write their
+# results in place and report the affected fleets in caller-provided buffers, returning how many
+# entries were filled. cache=True keeps the compiled code on disk so only the first run pays for it.
+#
+# The kernels are compiled eagerly for the exact column types below, so the compilation (or the cache
+# load) happens when this module is imported instead of stalling the first step of a game.
+#
+# Module constants (MAX_FLEET_SPEED, MAX_ATTACK_SPEED, NO_DESTINATION, ...) are frozen into the machine
+# code as literals. The kernels are deliberately not specialized on fleet/planet counts: the loops gather
+# through data dependent indices, so a known trip count would not let LLVM vectorize them, and generating
+# code per count would defeat both cache=True and the eager compilation.
+
+# Must match FLEET_COLUMNS/PLANET_COLUMNS in game.py
+INT64S = types.int64[::1]
+INT32S = types.int32[::1]
+INT16S = types.int16[::1]
+INT8S = types.int8[::1]
+BOOLS = types.boolean[::1]
+
+
+@njit(
+    types.void(
+        types.int64,  # fleet
+        types.int64,  # planet
+        INT32S,  # fleet_defended_planet
+        INT32S,  # fleet_defended_count
+        INT32S,  # planet_defender
+    ),
+    cache=True,
+)
+def release_planet(
+    fleet: int,
+    planet: int,
+    fleet_defended_planet: np.ndarray,
+    fleet_defended_count: np.ndarray,
+    planet_defender: np.ndarray,
+) -> None:
+    # Called once the planet has a new defender. A fleet only records one of the planets it defends,
+    # when that one is lost the entry moves to another planet it still holds, so find_planet stays O(1)
+    fleet_defended_count[fleet] -= 1
+    if fleet_defended_planet[fleet] != planet:
+        return
+
+    fleet_defended_planet[fleet] = NO_PLANET
+    if fleet_defended_count[fleet] == 0:
+        return
+
+    for other_planet in range(len(planet_defender)):
+        if planet_defender[other_planet] == fleet:
+            fleet_defended_planet[fleet] = other_planet
+            return
+
+
+@njit(
+    types.UniTuple(types.int64, 4)(
+        INT64S,  # fleets
+        INT16S,  # fleet_pos_x
+        INT16S,  # fleet_pos_y
+        INT8S,  # fleet_team
+        INT32S,  # fleet_strength
+        INT32S,  # fleet_dest
+        INT32S,  # fleet_defended_planet
+        INT32S,  # fleet_defended_count
+        INT16S,  # planet_pos_x
+        INT16S,  # planet_pos_y
+        INT32S,  # planet_defender
+        INT32S,  # planet_dock_radius_sq
+        BOOLS,  # planet_is_player
+        INT64S,  # moved_fleets
+        INT64S,  # merging_fleets
+        INT64S,  # merged_fleets
+        INT64S,  # destroyed_fleets
+    ),
+    cache=True,
+    fastmath=True,
+)
+def tick_kernel(
+    fleets: np.ndarray,
+    fleet_pos_x: np.ndarray,
+    fleet_pos_y: np.ndarray,
+    fleet_team: np.ndarray,
+    fleet_strength: np.ndarray,
+    fleet_dest: np.ndarray,
+    fleet_defended_planet: np.ndarray,
+    fleet_defended_count: np.ndarray,
+    planet_pos_x: np.ndarray,
+    planet_pos_y: np.ndarray,
+    planet_defender: np.ndarray,
+    planet_dock_radius_sq: np.ndarray,
+    planet_is_player: np.ndarray,
+    moved_fleets: np.ndarray,
+    merging_fleets: np.ndarray,
+    merged_fleets: np.ndarray,
+    destroyed_fleets: np.ndarray,
+) -> Tuple[int, int, int, int]:
+    # Single sweep over the fleets: each one moves, then reinforces or attacks if docked
+    moved = 0
+    merging = 0
+    merged = 0
+    destroyed = 0
+    for fleet in fleets:
+        # Defenders captured earlier in this sweep are left with a negative strength and no longer act.
+        # Zero strength fleets are still alive (emptied by a departure) and keep moving
+        if fleet_strength[fleet] < 0:
+            continue
+
+        planet = fleet_dest[fleet]
+
+        # fleet does not want to move (already docked somewhere)
+        if planet == NO_DESTINATION:
+            continue
+
+        defending_fleet = planet_defender[planet]
+
+        # Error Check : Ignore those that wants to defend where they're already where they want to defend
+        if defending_fleet == fleet:
+            fleet_dest[fleet] = NO_DESTINATION
+            continue
+
+        dx = planet_pos_x[planet] - fleet_pos_x[fleet]
+        dy = planet_pos_y[planet] - fleet_pos_y[fleet]
+        distance_sq = dx * dx + dy * dy
+
+        if distance_sq >= planet_dock_radius_sq[planet]:
+            # Step toward the destination. The docking radius is the planet's size plus a full step,
+            # so a fleet outside of it always moves at full speed without reaching the surface.
+            # Positions are whole coordinates, the rounding error is below one unit so a fleet always gets closer
+            step = MAX_FLEET_SPEED / math.sqrt(distance_sq)
+
+            fleet_pos_x[fleet] += round(dx * step)
+            fleet_pos_y[fleet] += round(dy * step)
+
+            moved_fleets[moved] = fleet
+            moved += 1
+
+            # Fleets arriving during this step dock right away
+            dx = planet_pos_x[planet] - fleet_pos_x[fleet]
+            dy = planet_pos_y[planet] - fleet_pos_y[fleet]
+            if dx * dx + dy * dy >= planet_dock_radius_sq[planet]:
+                continue
+
+        if fleet_team[fleet] == fleet_team[defending_fleet]:
+            reinforcement_value = min(fleet_strength[fleet], MAX_ATTACK_SPEED)
+
+            fleet_strength[defending_fleet] += reinforcement_value
+            fleet_strength[fleet] -= reinforcement_value
+
+            # Branchless bookkeeping: the fleet is written to both buffers, only one count moves on
+            is_merged = int(fleet_strength[fleet] == 0)
+            merged_fleets[merged] = fleet
+            merging_fleets[merging] = fleet
+            merged += is_merged
+            merging += 1 - is_merged
+            continue
+
+        defending_fleet_dmg = min(fleet_strength[fleet], MAX_ATTACK_SPEED)
+        attacking_fleet_dmg = min(fleet_strength[defending_fleet], MAX_ATTACK_SPEED)
+
+        # In case of draw, defending fleet keep 1 strength
+        defending_strength = fleet_strength[defending_fleet] - defending_fleet_dmg
+        defending_strength += int(defending_strength == 0)
+
+        fleet_strength[defending_fleet] = defending_strength
+        fleet_strength[fleet] -= attacking_fleet_dmg
+
+        # Captures are rare and touch several columns, they keep their branch
+        if defending_strength < 0:
+            destroyed_fleets[destroyed] = defending_fleet
+            destroyed += 1
+
+            # Only player fleets attack, so the captured planet becomes a player planet
+            planet_defender[planet] = fleet
+            planet_is_player[planet] = True
+            release_planet(
+                defending_fleet,
+                planet,
+                fleet_defended_planet,
+                fleet_defended_count,
+                planet_defender,
+            )
+            fleet_defended_planet[fleet] = planet
+            fleet_defended_count[fleet] += 1
+
+        destroyed_fleets[destroyed] = fleet
+        destroyed += int(fleet_strength[fleet] <= 0)
+
+    return moved, merging, merged, destroyed
+
+
+@njit(
+    types.void(
+        types.int64,  # tick
+        BOOLS,  # planet_is_player
+        INT32S,  # planet_production_speed
+        INT32S,  # planet_defender
+        INT32S,  # fleet_strength
+    ),
+    cache=True,
+    fastmath=True,
+)
+def production_kernel(
+    tick: int,
+    planet_is_player: np.ndarray,
+    planet_production_speed: np.ndarray,
+    planet_defender: np.ndarray,
+    fleet_strength: np.ndarray,
+) -> None:
+    # A planet produces a ship every production_speed ticks, derived from the tick instead of a countdown
+    for planet in range(len(planet_is_player)):
+        if planet_is_player[planet] and tick % planet_production_speed[planet] == 0:
+            fleet_strength[planet_defender[planet]] += 1
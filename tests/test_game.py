@@ -0,0 +1,278 @@
+import random
+from typing import Iterator
+
+import numpy as np
+import pytest
+
+from cq_galcon.game.constants import (
+    MAP_HEIGHT,
+    MAP_WIDTH,
+    MAX_ATTACK_SPEED,
+    MAX_FLEET_SPEED,
+    MAX_PRODUCTION_SPEED,
+    MIN_PRODUCTION_SPEED,
+    NO_PLANET,
+    Team,
+)
+from cq_galcon.game.entity import Fleet, Planet, Position
+from cq_galcon.game.game import Game
+
+
+def play_random_game(seed: int, ticks: int) -> Iterator[Game]:
+    # Sends a random share of the defenders to random planets every tick, yielding the game after each step
+    game = Game(seed)
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        planets = game.all_planets
+        commands = [
+            planet.defending_fleet.move(rng.choice(planets))
+            for planet in game.all_player_planets
+            if rng.random() < 0.1
+        ]
+        game.step(commands)
+        yield game
+
+
+def place_fleet(
+    game: Game, team: Team, planet: Planet, offset: int, strength: int
+) -> Fleet:
+    # Fleet heading to the planet from `offset` units to its right, so every step moves it along the x axis
+    return game.create_fleet(
+        team, Position(planet.x + offset, planet.y), strength, planet
+    )
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_free_fleets_never_hold_live_slots(seed: int):
+    for game in play_random_game(seed, 400):
+        assert len(set(game.free_fleets)) == len(game.free_fleets)
+        assert not game.fleet_alive[np.array(game.free_fleets, dtype=np.int64)].any()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_player_masks_and_caches_stay_consistent(seed: int):
+    for game in play_random_game(seed, 400):
+        defenders = game.planet_defender[: game.planet_count]
+        assert np.array_equal(
+            game.planet_is_player[: game.planet_count],
+            game.fleet_team[defenders] != Team.NEUTREAL.value,
+        )
+        assert not (game.fleet_is_player & ~game.fleet_alive).any()
+
+        assert game.all_player_planets == [
+            Planet(game, int(planet))
+            for planet in np.flatnonzero(game.planet_is_player)
+        ]
+        assert game.all_player_fleets == [
+            Fleet(game, int(fleet)) for fleet in np.flatnonzero(game.fleet_is_player)
+        ]
+        assert game.all_fleets == [
+            Fleet(game, int(fleet)) for fleet in np.flatnonzero(game.fleet_alive)
+        ]
+
+
+def test_fleet_moves_toward_its_destination():
+    game = Game(0)
+    planet = game.all_planets[1]
+    fleet = place_fleet(game, Team.TEAM_1, planet, 50, 10)
+
+    game.step([])
+
+    assert fleet.position == Position(planet.x + 50 - MAX_FLEET_SPEED, planet.y)
+    assert fleet.destination == planet
+    assert not fleet.can_dock(planet)
+
+
+def test_fleet_docks_during_the_step_it_arrives():
+    game = Game(0)
+    planet = game.all_planets[1]
+    defender_strength = planet.defending_fleet.strength
+    fleet = place_fleet(game, Team.TEAM_1, planet, planet.size + MAX_FLEET_SPEED + 2, 3)
+
+    game.step([])
+
+    assert fleet.can_dock(planet)
+    assert planet.defending_fleet.strength == defender_strength + 3
+    assert fleet not in game.all_fleets
+
+
+def test_reinforcement_is_capped_by_the_attack_speed():
+    game = Game(0)
+    planet = game.all_planets[1]
+    defender_strength = planet.defending_fleet.strength
+    fleet = place_fleet(game, Team.TEAM_1, planet, 0, MAX_ATTACK_SPEED + 5)
+
+    game.step([])
+
+    assert fleet.strength == 5
+    assert fleet in game.all_player_fleets
+    assert planet.defending_fleet.strength == defender_strength + MAX_ATTACK_SPEED
+
+    game.step([])
+
+    assert fleet not in game.all_fleets
+    assert planet.defending_fleet.strength == defender_strength + MAX_ATTACK_SPEED + 5
+
+
+def test_combat_draw_leaves_the_defender_one_ship():
+    game = Game(0)
+    planet = game.all_planets[1]
+    planet.defending_fleet.strength = MAX_ATTACK_SPEED
+    attacker = place_fleet(game, Team.TEAM_2, planet, 0, MAX_ATTACK_SPEED)
+
+    game.step([])
+
+    assert attacker not in game.all_fleets
+    assert planet.team == Team.TEAM_1
+    assert planet.defending_fleet.strength == 1
+
+
+def test_combat_captures_the_planet_when_the_defender_is_destroyed():
+    game = Game(0)
+    planet = game.all_planets[1]
+    defender = planet.defending_fleet
+    defender.strength = 5
+    attacker = place_fleet(game, Team.TEAM_2, planet, 0, 20)
+
+    game.step([])
+
+    assert defender not in game.all_fleets
+    assert planet.defending_fleet == attacker
+    assert planet.team == Team.TEAM_2
+    assert attacker.strength == 15
+    assert game.find_planet(attacker) == planet
+    assert planet in game.all_player_planets
+
+
+def test_player_planets_produce_one_ship_every_production_speed_ticks():
+    game = Game(0)
+    neutral_planet, planet = game.all_planets[:2]
+    neutral_strength = neutral_planet.defending_fleet.strength
+    strength = planet.defending_fleet.strength
+
+    for _ in range(planet.production_speed - 1):
+        game.step([])
+    assert planet.defending_fleet.strength == strength
+    assert planet.remaining_until_new_ship == 1
+
+    game.step([])
+    assert planet.defending_fleet.strength == strength + 1
+    assert planet.remaining_until_new_ship == planet.production_speed
+    assert neutral_planet.defending_fleet.strength == neutral_strength
+
+
+def test_captured_defender_does_not_act_later_in_the_same_step():
+    game = Game(0)
+    planet = game.all_planets[1]
+    attacker = place_fleet(game, Team.TEAM_2, planet, 0, 20)
+
+    # Friendly planet on top of the attacked one, its defender is ordered there and sweeps after the attacker
+    friendly_defender = game.create_fleet(Team.TEAM_1, planet.position, 30, None)
+    friendly_planet = game.create_planet(
+        planet.position, planet.production_speed, friendly_defender
+    )
+    defender = game.create_fleet(Team.TEAM_1, planet.position, 5, friendly_planet)
+    planet.defending_fleet = defender
+    assert attacker.index < defender.index
+
+    game.step([])
+
+    assert planet.defending_fleet == attacker
+    assert defender not in game.all_fleets
+    assert friendly_planet.defending_fleet.strength == 30
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_find_planet_matches_a_scan_of_player_planets(seed: int):
+    for game in play_random_game(seed, 400):
+        defenders = game.planet_defender[: game.planet_count]
+        defended_planets = game.fleet_defended_planet[: game.fleet_count]
+        counts = np.bincount(defenders, minlength=game.fleet_count)
+        assert np.array_equal(game.fleet_defended_count[: game.fleet_count], counts)
+        assert np.array_equal(
+            defenders[defended_planets[counts > 0]], np.flatnonzero(counts)
+        )
+        assert (defended_planets[counts == 0] == NO_PLANET).all()
+
+        # Defenders can be dead fleets still holding their planet, so they are not all in all_player_fleets
+        defending_fleets = {planet.defending_fleet for planet in game.all_planets}
+        for fleet in defending_fleets.union(game.all_player_fleets):
+            defended = [
+                planet
+                for planet in game.all_player_planets
+                if planet.defending_fleet == fleet
+            ]
+            planet = game.find_planet(fleet)
+            if defended:
+                assert planet in defended
+            else:
+                assert planet is None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_planets_near_contains_every_dockable_planet(seed: int):
+    game = Game(seed)
+    rng = random.Random(seed)
+    for _ in range(40):
+        position = Position(rng.randint(0, MAP_WIDTH), rng.randint(0, MAP_HEIGHT))
+        fleet = game.create_fleet(Team.NEUTREAL, position, 1, None)
+        game.create_planet(
+            position,
+            rng.randint(MAX_PRODUCTION_SPEED, MIN_PRODUCTION_SPEED),
+            fleet,
+        )
+
+    game.planets_near(0, 0)
+    cell_size = game._planet_cell_size
+    boundaries = [
+        cell * cell_size + shift for cell in range(-2, 8) for shift in (-1, 0, 1)
+    ]
+    points = [
+        (rng.uniform(-64, MAP_WIDTH + 64), rng.uniform(-64, MAP_HEIGHT + 64))
+        for _ in range(500)
+    ]
+    points += [
+        (rng.randint(-64, MAP_WIDTH + 64), rng.randint(-64, MAP_HEIGHT + 64))
+        for _ in range(500)
+    ]
+    points += [(x, y) for x in boundaries for y in boundaries]
+
+    for x, y in points:
+        candidates = set(game.planets_near(x, y))
+        for planet in game.all_planets:
+            dx = planet.x - x
+            dy = planet.y - y
+            if dx * dx + dy * dy < planet.dock_radius_sq:
+                assert planet.index in candidates, (x, y, planet.index)
+
+
+def test_views_of_a_dead_fleet_do_not_follow_its_reused_slot():
+    game = Game(0)
+    planet, other_planet = game.all_planets[1:3]
+    dead_fleet = place_fleet(game, Team.TEAM_1, planet, 0, 1)
+    game.step([])
+    assert dead_fleet not in game.all_fleets
+
+    fleet = place_fleet(game, Team.TEAM_1, planet, 50, 1)
+    assert fleet.index == dead_fleet.index
+    assert fleet != dead_fleet
+    assert fleet in game.all_fleets
+
+    game.step([dead_fleet.move(other_planet)])
+    assert fleet.destination == planet
+
+    with pytest.raises(ValueError):
+        dead_fleet.strength = 999
+    with pytest.raises(ValueError):
+        dead_fleet.destination = other_planet
+    with pytest.raises(ValueError):
+        dead_fleet.position = Position(0, 0)
+    with pytest.raises(ValueError):
+        dead_fleet.strength
+    with pytest.raises(ValueError):
+        game.find_planet(dead_fleet)
+    assert fleet.strength == 1
+    assert fleet.destination == planet
+
+    game.step([fleet.move(other_planet)])
+    assert fleet.destination == other_planet